@@ -8,7 +8,7 @@ from src.settings import logger, DATA_PATH, config
 import numpy as np
 import pandas as pd
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 import argparse
 import os
 import json
@@ -22,17 +22,29 @@ class Backtesting:
     MAX_VOLUME = 20000  # Maximum volume of stocks to buy/sell in one transaction
 
     def __init__(self, start_date: datetime, end_date: datetime,
-                 params: Dict[str, Any] = config["default_backtest_params"]):
+                 params: Optional[Dict[str, Any]] = None):
         """
         Initialize the backtesting environment.
 
         :param start_date: Start date of the simulation.
         :param end_date: End date of the simulation.
-        :param initial_balance: Initial cash balance for the portfolio.
+        :param params: Strategy parameters. If None, the stocks are not
+            ranked until set_params is called.
         """
         self.start_date = start_date
         self.end_date = end_date
-        self.portfolio = Portfolio("Test Portfolio", params["initial_balance"])
+        self.simulation = MarketSimulation(start_date, end_date)
+        self.stocks = get_stocks_list()  # List of available stocks
+        if params is not None:
+            self.set_params(params)
+
+    def set_params(self, params: Dict[str, Any]) -> None:
+        """
+        Set the strategy parameters and reset the state for a new run,
+        so one instance can be reused across runs (e.g. Optuna trials).
+
+        :param params: Strategy parameters.
+        """
         self.NUMBER_OF_STOCKS = params.get(
             "number_of_stocks", 3)
         self.TRAILING_STOP_LOSS = params.get(
@@ -42,8 +54,20 @@ class Backtesting:
         self.WEIGHTING_OPTION = params.get(
             "stock_weight_option", "softmax")
         self.params = params
-        self.simulation = MarketSimulation(start_date, end_date)
-        self.stocks = get_stocks_list()  # List of available stocks
+        # Rankings of every backtest month for these params, in one pass
+        self.rankings = StocksRanking.rank_many(
+            [(period.month, period.year) for period in pd.period_range(
+                self.start_date, self.end_date, freq="M")],
+            self.stocks, params)
+        self.reset_state()
+
+    def reset_state(self) -> None:
+        """
+        Reset the portfolio, the simulation and the run statistics.
+        """
+        self.portfolio = Portfolio(
+            "Test Portfolio", self.params["initial_balance"])
+        self.simulation.reset()
         self.top_stocks = []  # Top stocks for rebalancing
         self.need_rebalance = "no"  # Flag to indicate if rebalancing is needed
         self.peak_prices = {}  # Track the peak price of each stock in the portfolio
@@ -144,11 +168,9 @@ class Backtesting:
 
         # Step 2 (Day 2): Allocate funds for buying
         elif self.need_rebalance == "buy":
-            ranked_stocks = StocksRanking(
-                self.simulation.current_date.month,
-                self.simulation.current_date.year,
-                self.stocks,
-                self.params).get_ranking()
+            ranked_stocks = self.rankings.get(
+                (self.simulation.current_date.month,
+                 self.simulation.current_date.year), [])
             self.top_stocks = [symbol for symbol,
                                _ in ranked_stocks[:self.NUMBER_OF_STOCKS]]
             logger.info(f"{self.simulation.current_date.date()} "
@@ -226,14 +248,21 @@ class Backtesting:
 
         return False
 
-    def run(self):
+    def run(self,
+            on_month_end: Optional[
+                Callable[[int, List[Dict[str, Any]]], None]] = None):
         """
         Run the backtesting simulation.
+
+        :param on_month_end: Optional callback called at the start of each
+            new month with the number of completed months and the portfolio
+            statistics so far. It may raise to stop the simulation early.
         """
         logger.info(f"Starting backtesting process for the period "
                     f"{self.start_date.date()} to {self.end_date.date()}")
         start_time = time.time()
         last_month = self.simulation.current_date.month
+        completed_months = 0
         self.need_rebalance = "buy"
 
         while self.simulation.step():
@@ -241,6 +270,9 @@ class Backtesting:
             if current_date.month != last_month:
                 last_month = current_date.month
                 self.need_rebalance = "sell"
+                completed_months += 1
+                if on_month_end is not None and self.portfolio_statistics:
+                    on_month_end(completed_months, self.portfolio_statistics)
 
             items = list(self.portfolio.assets.items())
             is_last_trading_day = self.simulation.is_last_trading_day()
@@ -362,7 +394,8 @@ if __name__ == '__main__':
             backtesting = Backtesting(
                 start_date, end_date, params=params)
     else:
-        backtesting = Backtesting(start_date, end_date)
+        backtesting = Backtesting(
+            start_date, end_date, params=config["default_backtest_params"])
 
     backtesting.run()
     result_dir = f"{DATA_PATH}/backtest/{args.name}"
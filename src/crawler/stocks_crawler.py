@@ -1,6 +1,5 @@
-from src.settings import DATABASE, DATA_PATH, logger, config
+from src.settings import DATABASE, DATA_PATH, logger, config, get_vnstock
 from src.recommendation.data import get_stocks_list
-# from src.recommendation.stocks import USED_COLUMNS
 import psycopg2
 import pandas as pd
 from datetime import datetime
@@ -19,16 +18,6 @@ WHERE c.datetime BETWEEN %s AND %s
 ORDER BY c.datetime DESC
 """
 
-# FINANCIAL_QUERY = """
-# SELECT if.tickersymbol, if.year, if.quarter, it.name, if.value
-# FROM financial.info if
-# JOIN financial.item it ON if.code = it.code
-# WHERE if.year BETWEEN %s AND %s
-#     AND if.tickersymbol = ANY(%s)  -- Filter tickers using a list
-#     AND it.name = ANY(%s)  -- Filter items using a list
-# ORDER BY if.tickersymbol, if.year, if.quarter, it.name
-# """
-
 
 def execute_query(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
     """
@@ -60,19 +49,6 @@ def execute_query(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
             logger.debug("Database connection closed.")
 
 
-# def get_last_close_price(df: pd.DataFrame) -> pd.DataFrame:
-#     """
-#     Retrieve the last close price of each stock at the end of each quarter.
-#     """
-#     df['quarter'] = df['datetime'].dt.to_period('Q') - 1
-#     last_close_prices = df.sort_values(by=['datetime']).groupby(
-#         ['tickersymbol', 'quarter']).last().reset_index()
-#     last_close_prices = last_close_prices[['tickersymbol', 'quarter', 'price']]
-#     last_close_prices.rename(
-#         columns={'price': 'last_close_price'}, inplace=True)
-#     return last_close_prices
-
-
 def get_daily_data(start_date: datetime, end_date: datetime) -> pd.DataFrame:
     """
     Get daily data from the database for the given date range.
@@ -118,7 +94,7 @@ def get_financial_data(start_date: datetime, end_date: datetime) -> pd.DataFrame
     """
     Retrieve financial data for the given date range.
     """
-    from src.settings import vnstock
+    vnstock = get_vnstock()
 
     logger.info(f"Fetching financial data from {start_date} to {end_date}.")
     if start_date > end_date:
@@ -7,6 +7,7 @@ import unicodedata
 import json
 import argparse
 from tqdm import tqdm
+import numpy as np
 import pandas as pd
 from typing import Tuple
 from datetime import datetime
@@ -111,41 +112,44 @@ class VCBFCrawler():
                         e}")
         print("Extracted all data")
 
+    def find_rows(self, df: pd.DataFrame, keyword: str) -> pd.Index:
+        """
+        Find the rows with any cell containing the keyword (case-insensitive).
+        Each column is matched with one vectorized string operation instead
+        of a Python callback per row.
+        """
+        text = df.astype(str)
+        mask = np.zeros(len(df), dtype=bool)
+        for column in text.columns:
+            mask |= text[column].str.contains(
+                keyword, case=False, na=False, regex=False).to_numpy()
+        return df.index[mask]
+
     def extract_data(self, file, save_dir):
         df = pd.read_excel(file, sheet_name=self.SHEET_NAME)
 
         # Extract all rows containing the specified text in any column
-        keyword = "STT"
-        matches = df[df.apply(lambda row: row.astype(str).str.contains(
-            keyword, case=False, na=False).any(), axis=1)]
+        matches = self.find_rows(df, "STT")
 
         # Display the extracted rows
-        columns = []
-        for i in range(len(df.columns)):
-            columns.append(df.iloc[matches.index[0], i])
+        columns = df.iloc[matches[0]].tolist()
         print(columns)
 
-        keyword = "CỔ PHIẾU NIÊM YẾT"
-        matches = df[df.apply(lambda row: row.astype(str).str.contains(
-            keyword, case=False, na=False).any(), axis=1)]
+        matches = self.find_rows(df, "CỔ PHIẾU NIÊM YẾT")
 
-        start_row = matches.index[0] + 2
+        start_row = matches[0] + 2
 
         # Extract all rows under the specified section until an empty row or a new section is detected
-        section_data = []
-        for i in range(start_row, len(df)):
-            row = df.iloc[i]
-            # Stop if we encounter an empty row or a new section header
-            if row.isna().iloc[0] or "TOTAL" in str(row.iloc[1]).upper():
-                break
-            section_data.append(row)
+        rows = df.iloc[start_row:]
+        stop = rows.iloc[:, 0].isna().to_numpy() | rows.iloc[:, 1].astype(
+            str).str.upper().str.contains("TOTAL", regex=False).to_numpy()
+        section_data = rows.iloc[:np.argmax(stop) if stop.any() else len(rows)]
 
-        if section_data == []:
-            raise "No data found in the specified section"
+        if section_data.empty:
+            raise ValueError("No data found in the specified section")
 
         # Convert the extracted data to a DataFrame for better readability
-        section_df = pd.DataFrame(section_data)
-        section_df.reset_index(drop=True, inplace=True)
+        section_df = section_data.reset_index(drop=True)
         section_df.columns = columns
 
         # keep column contain "Category" or "Value" or "total asset"
@@ -188,9 +192,9 @@ class VCBFCrawler():
         files = os.listdir(f"{save_dir}/{self.EXTRACT_DIR}")
         columns = ['Fund Code', 'Date', 'Category', 'Quantity',
                    'Market Price', 'Value', 'Total Asset Ratio']
-        merged_df = pd.DataFrame()
-        merged_df = merged_df.reindex(columns=columns)
-
+        # Collect the frames and concatenate once, instead of copying the
+        # accumulated frame for every file
+        frames = [pd.DataFrame(columns=columns)]
         for file in files:
             df = pd.read_csv(f"{save_dir}/{self.EXTRACT_DIR}/{file}")
             # skip empty files
@@ -200,8 +204,9 @@ class VCBFCrawler():
             date, symbol = self.extract_date_symbol(file)
             df['Date'] = date
             df['Fund Code'] = symbol
-            merged_df = pd.concat([merged_df, df], ignore_index=True)
+            frames.append(df)
 
+        merged_df = pd.concat(frames, ignore_index=True)
         merged_df.to_csv(f"{save_dir}/fund_portfolios.csv", index=False)
 
 
@@ -67,8 +67,8 @@ class Evaluate:
         Calculate the return on investment (ROI).
         ROI = (Final Value - Initial Value) / Initial Value * 100
         """
-        initial_value = self.data["total_assets"].iloc[0]
-        final_value = self.data["total_assets"].iloc[-1]
+        initial_value = self.data["total_assets"].iat[0]
+        final_value = self.data["total_assets"].iat[-1]
         roi = (final_value - initial_value) / initial_value * 100
         return roi
 
@@ -77,8 +77,8 @@ class Evaluate:
         Calculate the total profit and loss (P&L).
         Total P&L = Final Value - Initial Value
         """
-        initial_value = self.data["total_assets"].iloc[0]
-        final_value = self.data["total_assets"].iloc[-1]
+        initial_value = self.data["total_assets"].iat[0]
+        final_value = self.data["total_assets"].iat[-1]
         total_pnl = final_value - initial_value
         return total_pnl
 
@@ -137,8 +137,8 @@ class Evaluate:
         Calculate the compound annual growth rate (CAGR).
         CAGR = (Final Value / Initial Value) ^ (1 / Number of Years) - 1
         """
-        initial_value = self.data["total_assets"].iloc[0]
-        final_value = self.data["total_assets"].iloc[-1]
+        initial_value = self.data["total_assets"].iat[0]
+        final_value = self.data["total_assets"].iat[-1]
         num_years = (self.data.index[-1] - self.data.index[0]).days / 365.25
         cagr = (final_value / initial_value) ** (1 / num_years) - 1
         return cagr * 100
@@ -220,9 +220,9 @@ class Evaluate:
 
         # Calculate daily returns for both strategy and benchmark
         comparison_df["cummulative_return"] = (
-            comparison_df["total_assets"] / comparison_df["total_assets"].iloc[0]) - 1
+            comparison_df["total_assets"] / comparison_df["total_assets"].iat[0]) - 1
         comparison_df["cummulative_return_benchmark"] = (
-            comparison_df["total_assets_benchmark"] / comparison_df["total_assets_benchmark"].iloc[0]) - 1
+            comparison_df["total_assets_benchmark"] / comparison_df["total_assets_benchmark"].iat[0]) - 1
         return comparison_df
 
     def get_cash_flow(self) -> pd.DataFrame:
@@ -247,7 +247,7 @@ class Evaluate:
         Cumulative Returns = (Current Value / Initial Value) - 1
         """
         self.data["cumulative_returns"] = (
-            self.data["total_assets"] / self.data["total_assets"].iloc[0]) - 1
+            self.data["total_assets"] / self.data["total_assets"].iat[0]) - 1
         return self.data[["cumulative_returns"]]
 
     def plot_daily_returns(self, result_dir: str) -> None:
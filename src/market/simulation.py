@@ -42,10 +42,14 @@ class MarketSimulation:
                 "No trading days available in the specified date range."
             )
 
+        logger.debug(f"Trading days: {self.trading_days}")
+        self.reset()
+
+    def reset(self) -> None:
+        """Rewind the simulation to the first trading day."""
         # Cache for the latest price of each stock
         self.latest_price_cache = {}
 
-        logger.debug(f"Trading days: {self.trading_days}")
         self.current_trading_day_index = 0
         self.current_date = self.trading_days[self.current_trading_day_index]
         self.current_data = MarketSimulation.MARKET_DATA_BY_DATE.get(
@@ -139,7 +143,7 @@ class MarketSimulation:
         asset_data = MarketSimulation.MARKET_DATA[
             (MarketSimulation.MARKET_DATA['tickersymbol'] == asset) &
             (MarketSimulation.MARKET_DATA['datetime'] <= self.current_date)
-        ].sort_values('datetime', ascending=False)
+        ]
 
         if asset_data.empty:
             logger.error(
@@ -148,7 +152,10 @@ class MarketSimulation:
             self.latest_price_cache[asset] = 0.0  # Cache the result as 0.0
             return 0.0
 
-        last_price = asset_data.iloc[0]['price']
+        # Pick the latest row's price directly instead of sorting the rows
+        # and materializing the first one as a Series
+        latest = asset_data['datetime'].to_numpy().argmax()
+        last_price = asset_data['price'].iat[latest]
         self.latest_price_cache[asset] = last_price  # Cache the result
         return last_price
 
@@ -5,14 +5,18 @@ import optuna
 from src.backtest import Backtesting
 from src.evaluate import Evaluate
 from src.settings import logger, config, DATA_PATH
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime
 import argparse
 import json
 
 
 class Optimizer:
+    PRUNING_WARMUP_MONTHS = 6  # Months before a trial can be pruned
+    PRUNING_INTERVAL_MONTHS = 3  # Months between two pruning checks
+
     def __init__(self, start_date: datetime, end_date: datetime,
                  result_dir: str, n_stocks: int) -> None:
         self.start_date = start_date
@@ -23,7 +27,15 @@ class Optimizer:
 
         # Set the random seed for reproducibility
         random_seed = config.get("random_seed", 42)
-        sampler = optuna.samplers.TPESampler(seed=random_seed)
+        # Model the conditional weight parameters jointly; constant_liar
+        # keeps concurrent trials from clustering on the same point
+        sampler = optuna.samplers.TPESampler(
+            seed=random_seed,
+            multivariate=True,
+            group=True,
+            constant_liar=True,
+            n_startup_trials=20,
+        )
         # Create the study object
         storage_path = f"sqlite:///{
             os.path.join(result_dir, config['optuna']['storage_name'])}.db"
@@ -35,9 +47,13 @@ class Optimizer:
             study_name=config["optuna"]["study_name"],
             storage=storage_path,
             sampler=sampler,
+            pruner=optuna.pruners.MedianPruner(
+                n_warmup_steps=self.PRUNING_WARMUP_MONTHS),
             load_if_exists=True,
             direction="maximize",
         )
+        # Backtesting engine reused by every trial, ranked by set_params
+        self.engine = Backtesting(start_date=start_date, end_date=end_date)
 
     def objective_function(self, trial: optuna.Trial) -> float:
         """
@@ -77,16 +93,43 @@ class Optimizer:
             min(max_range, 0.5), step=0.025)
 
         # Run the backtest with the sampled parameters
-        backtest = Backtesting(
-            start_date=self.start_date,
-            end_date=self.end_date,
-            params=params
-        )
-        backtest.run()
-        data = pd.DataFrame(backtest.portfolio_statistics)
-        results = Evaluate(data,
-                           name=f"backtest_trial_{trial.number}"
-                           ).quick_evaluate()
+        self.engine.set_params(params)
+
+        def report_progress(step: int,
+                            statistics: List[Dict[str, Any]]) -> None:
+            # Stop hopeless parameter sets early, judged on the running
+            # value of the same target the study maximizes. Each check
+            # evaluates the whole run so far, so only check every few
+            # months once the pruner is past its warmup.
+            if step < self.PRUNING_WARMUP_MONTHS or \
+                    (step - self.PRUNING_WARMUP_MONTHS) \
+                    % self.PRUNING_INTERVAL_MONTHS:
+                return
+            target = self.get_target(statistics, trial.number)
+            if not np.isfinite(target):
+                return
+            trial.report(target, step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+
+        self.engine.run(on_month_end=report_progress)
+        return self.get_target(self.engine.portfolio_statistics, trial.number)
+
+    @staticmethod
+    def get_target(statistics: List[Dict[str, Any]],
+                   trial_number: int) -> float:
+        """
+        Objective value of a backtest: a blend of its Sharpe ratio and
+        maximum drawdown scores.
+        :param statistics: Daily portfolio statistics of the backtest.
+        :param trial_number: Number of the trial, used to name the evaluation.
+        :return: Objective value to maximize.
+        """
+        data = pd.DataFrame(statistics)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            results = Evaluate(data,
+                               name=f"backtest_trial_{trial_number}"
+                               ).quick_evaluate()
         mdd_score = (1.0 if results["mdd"] >= -0.05
                      else 0.0 if results["mdd"] <= -0.20
                      else (0.2 + results["mdd"])/0.15)
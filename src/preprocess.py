@@ -4,8 +4,79 @@ from src.recommendation.data import get_stocks_list, FUND_DF, FINANCIAL_DF
 from src.settings import logger, DATA_PATH
 
 import pandas as pd
+import logging
 import os
+import argparse
 from datetime import datetime
+from joblib import Parallel, delayed
+from typing import List
+
+# Columns and dtypes of the monthly_scores.csv written by older versions
+CSV_SCORES_DTYPES = {
+    "symbol": "category",
+    "fund_net_buying": "float32",
+    "number_fund_holdings": "float32",
+    "net_fund_change": "float32",
+    "roe": "float32",
+    "debt_to_equity": "float32",
+    "revenue_growth": "float32",
+    "pe": "float32",
+    "month": "int16",
+    "year": "int16",
+}
+
+
+def score_month(current: pd.Period, last: pd.Period, last_q: pd.Period,
+                symbols: List[str]) -> pd.DataFrame:
+    """
+    Calculate the institutional and financial scores used in a month.
+    :param current: Month to calculate the scores for.
+    :param last: Month of the institutional data.
+    :param last_q: Quarter of the financial data.
+    :param symbols: List of stock symbols.
+    :return: pd.DataFrame of merged scores, empty if any source is missing.
+    """
+    last_month, last_year = last.month, last.year
+    last_quarter, last_quarter_year = last_q.quarter, last_q.year
+    logger.info(f"Processing month: {current.month}, year: {current.year}\n"
+                f"Using institutional data from {last_month}/{last_year}\n"
+                f"and financial data from Q{last_quarter}/{last_quarter_year}")
+
+    # Initialize scoring classes
+    inst_scoring = InstitutionalScoring(last_month, last_year, symbols)
+    fin_scoring = FinancialScoring(
+        last_quarter, last_quarter_year, symbols)
+
+    # Get scores for institutional and financial data
+    inst_scores_df = inst_scoring.get_scores()
+    fin_scores = fin_scoring.get_score_arrays()
+
+    if inst_scores_df.empty or not fin_scores:
+        empty_df = []
+        if inst_scores_df.empty:
+            empty_df.append("institutional")
+        if not fin_scores:
+            empty_df.append("financial")
+        logger.warning(
+            f"Empty {empty_df} scores DataFrame for month "
+            f"{current.month} year {current.year}. Skipping.")
+        return pd.DataFrame()
+
+    # Align both score frames on the union of symbols
+    inst_scores_df = inst_scores_df.set_index("symbol")
+    # The financial frame is built straight from its arrays, indexed by symbol
+    fin_symbols = pd.Index(fin_scores.pop("symbol"), name="symbol")
+    fin_scores_df = pd.DataFrame(fin_scores, index=fin_symbols, copy=False)
+    symbols_index = inst_scores_df.index.union(fin_scores_df.index)
+    merged_df = pd.concat([inst_scores_df.reindex(symbols_index),
+                           fin_scores_df.reindex(symbols_index)],
+                          axis=1).fillna(0).rename_axis("symbol").reset_index()
+    merged_df["month"] = current.month
+    merged_df["year"] = current.year
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            f"Merged DataFrame: \n{merged_df.head(10).to_string(index=False)}")
+    return merged_df
 
 
 def main() -> None:
@@ -23,68 +94,58 @@ def main() -> None:
     logger.info(f"Symbols: {symbols}")
     logger.info(f"Start date: {start_date}, End date: {end_date}")
 
-    # Iterate monthly from start_date to end_date
-    current_date = start_date
-    end_date = end_date.replace(day=1)  # Set to the first day of the month
-
-    monthly_data = pd.DataFrame()
-    while current_date <= end_date:
-        last_month, last_year = current_date.month - 1, current_date.year
-        if last_month == 0:
-            last_month = 12
-            last_year -= 1
-        quarter = (current_date.month - 1) // 3 + 1
-        last_quarter = quarter - 1 if quarter > 1 else 4
-        last_quarter_year = current_date.year - \
-            1 if last_quarter == 4 else current_date.year
-        logger.info(f"Processing month: {current_date.month}, year: {current_date.year}\n"
-                    f"Using institutional data from {last_month}/{last_year}\n"
-                    f"and financial data from Q{last_quarter}/{last_quarter_year}")
-
-        # Initialize scoring classes
-        inst_scoring = InstitutionalScoring(last_month, last_year, symbols)
-        fin_scoring = FinancialScoring(
-            last_quarter, last_quarter_year, symbols)
-
-        # Get scores for institutional and financial data
-        inst_scores_df = inst_scoring.get_scores()
-        fin_scores_df = fin_scoring.get_scores()
-
-        if inst_scores_df.empty or fin_scores_df.empty:
-            empty_df = []
-            if inst_scores_df.empty:
-                empty_df.append("institutional")
-            if fin_scores_df.empty:
-                empty_df.append("financial")
-            logger.warning(
-                f"Empty {empty_df} scores DataFrame for month "
-                f"{current_date.month} year {current_date.year}. Skipping.")
-            current_date = current_date.replace(
-                day=1) + pd.DateOffset(months=1)
-            continue
-
-        # Merge scores DataFrames
-        merged_df = pd.merge(inst_scores_df, fin_scores_df,
-                             on="symbol", how="outer").fillna(0)
-        merged_df["month"] = current_date.month
-        merged_df["year"] = current_date.year
-        logger.debug(
-            f"Merged DataFrame: \n{merged_df.head(10).to_string(index=False)}")
+    # Compute every month with its previous month and quarter up front
+    months = pd.period_range(start_date, end_date, freq="M")
+    last_months = months - 1
+    last_quarters = months.asfreq("Q") - 1
+
+    # Months are independent. Threads share the loaded data frames and the
+    # log file, whereas worker processes would reload (and truncate) both.
+    monthly_frames = Parallel(n_jobs=-1, prefer="threads")(
+        delayed(score_month)(current, last, last_q, symbols)
+        for current, last, last_q in zip(months, last_months, last_quarters)
+    )
 
-        monthly_data = pd.concat([monthly_data, merged_df], ignore_index=True)
+    df = pd.concat([frame for frame in monthly_frames if not frame.empty],
+                   ignore_index=True)
+    save_monthly_scores(df)
 
-        # Move to the next month
-        current_date = current_date.replace(
-            day=1) + pd.DateOffset(months=1)
 
-    # Save the merged DataFrame to a CSV file
-    output_file = os.path.join(DATA_PATH, "monthly_scores.csv")
-    df = pd.DataFrame(monthly_data)
-    df.sort_values(by=["year", "month", "symbol"], inplace=True)
-    df.reset_index(drop=True, inplace=True)
-    df.to_csv(output_file, index=False)
+def save_monthly_scores(df: pd.DataFrame) -> None:
+    """
+    Save the monthly scores to a Parquet file, sorted by period and symbol.
+    """
+    output_file = os.path.join(DATA_PATH, "monthly_scores.parquet")
+    df = df.sort_values(by=["year", "month", "symbol"], ignore_index=True)
+    # Stored as a dictionary column, loaded back as a categorical
+    df["symbol"] = df["symbol"].astype("category")
+    df.to_parquet(output_file, engine="pyarrow", compression="zstd",
+                  index=False)
     logger.info(f"Scores saved to {output_file}")
 
 
+def convert_csv_scores() -> None:
+    """
+    Convert a monthly_scores.csv produced by older versions to Parquet.
+    """
+    input_file = os.path.join(DATA_PATH, "monthly_scores.csv")
+    logger.info(f"Converting {input_file} to Parquet")
+    # Explicit columns and dtypes skip the inference pass and leave out any
+    # extra columns older versions wrote
+    save_monthly_scores(pd.read_csv(
+        input_file, engine="pyarrow", usecols=list(CSV_SCORES_DTYPES),
+        dtype=CSV_SCORES_DTYPES))
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(
+        description="Preprocess monthly scores for backtesting")
+    parser.add_argument("--from_csv", action="store_true", default=False,
+                        help="Convert an existing monthly_scores.csv "
+                        "instead of recomputing the scores")
+    args = parser.parse_args()
+
+    if args.from_csv:
+        convert_csv_scores()
+    else:
+        main()
@@ -1,6 +1,8 @@
 from src.settings import DATA_PATH, logger
+import numpy as np
 import pandas as pd
-from typing import List
+from typing import List, Dict, Tuple
+import functools
 import os
 
 
@@ -8,32 +10,106 @@ import os
 try:
     logger.debug("Loading fund portfolios data from JSON file.")
     path = os.path.join(DATA_PATH, "VCBF/fund_portfolios.csv")
-    FUND_DF = pd.read_csv(path)
+    # The multithreaded pyarrow parser is much faster than the C engine
+    FUND_DF = pd.read_csv(path, engine="pyarrow")
     FUND_DF["Date"] = pd.to_datetime(FUND_DF["Date"], format="%Y-%m-%d")
+    FUND_DF["_year"] = FUND_DF["Date"].dt.year.astype("int16")
+    FUND_DF["_month"] = FUND_DF["Date"].dt.month.astype("int16")
+    # Narrower dtypes halve the bytes moved by the scoring passes
+    FUND_DF["Value"] = FUND_DF["Value"].astype("float32")
+    FUND_DF["Quantity"] = pd.to_numeric(
+        FUND_DF["Quantity"], downcast="integer")
+    # Keep rows ordered by period, symbol and fund so each period and each
+    # symbol within it is a contiguous block
+    FUND_DF.sort_values(["_year", "_month", "Category", "Fund Code"],
+                        inplace=True, ignore_index=True)
+    # Symbols and fund codes repeat on every row; as categoricals the
+    # groupby and pivot keys compare integer codes instead of strings
+    FUND_DF[["Category", "Fund Code"]] = FUND_DF[
+        ["Category", "Fund Code"]].astype("category")
     logger.info(
         f"Fund portfolios data loaded successfully with {len(FUND_DF)} rows.")
 except Exception as e:
     logger.error(f"Failed to load fund portfolios data: {e}")
     FUND_DF = pd.DataFrame()  # Fallback to an empty DataFrame
 
-# Load financial data
+# Sorted period keys (year * 100 + month) for binary-search slicing
+FUND_PERIOD_KEYS = (
+    FUND_DF["_year"].to_numpy(dtype=np.int64) * 100
+    + FUND_DF["_month"].to_numpy(dtype=np.int64)
+) if not FUND_DF.empty else np.empty(0, dtype=np.int64)
+
+
+def slice_period(year: int, month: int) -> pd.DataFrame:
+    """
+    Get the fund holdings of the given month as a slice of FUND_DF
+    """
+    key = year * 100 + month
+    start = np.searchsorted(FUND_PERIOD_KEYS, key, side="left")
+    end = np.searchsorted(FUND_PERIOD_KEYS, key, side="right")
+    return FUND_DF.iloc[start:end]
+
+
+# Financial metrics used by the scoring, in the order FinancialScoring
+# reads them
+FINANCIAL_COLUMNS = ["Revenue", "ROE", "Debt/Equity", "P/E"]
+
+# Load financial data, keeping only the key and used metric columns
 try:
     logger.debug("Loading financial data from JSON file.")
     path = os.path.join(DATA_PATH, "financial_data.csv")
-    FINANCIAL_DF = pd.read_csv(path)
+    # Typed copy of the CSV, reused until the CSV changes
+    parquet_path = os.path.join(DATA_PATH, "financial_data.parquet")
+    if os.path.exists(parquet_path) and \
+            os.path.getmtime(parquet_path) >= os.path.getmtime(path):
+        FINANCIAL_DF = pd.read_parquet(
+            parquet_path, engine="pyarrow",
+            columns=["tickersymbol", "year", "quarter", *FINANCIAL_COLUMNS])
+        FINANCIAL_DF["tickersymbol"] = FINANCIAL_DF["tickersymbol"].astype(
+            "string[pyarrow]")
+    else:
+        # Arrow-backed tickers compare in Arrow compute kernels instead of
+        # per-element Python string comparisons
+        FINANCIAL_DF = pd.read_csv(
+            path, engine="pyarrow",
+            usecols=["tickersymbol", "year", "quarter", *FINANCIAL_COLUMNS],
+            dtype={"tickersymbol": "string[pyarrow]", "year": "int16",
+                   "quarter": "int16",
+                   **{column: "float32" for column in FINANCIAL_COLUMNS}})
+        try:
+            FINANCIAL_DF.to_parquet(parquet_path, engine="pyarrow",
+                                    compression="zstd", index=False)
+        except Exception as e:
+            logger.warning(f"Failed to cache financial data: {e}")
     logger.info(
         f"Financial data loaded successfully with {len(FINANCIAL_DF)} rows.")
 except Exception as e:
     logger.error(f"Failed to load financial data: {e}")
     FINANCIAL_DF = pd.DataFrame()
 
+# Index each quarter by ticker symbol once, keeping the first row per
+# symbol and only the used metrics, so lookups are dict hits instead of
+# full-table mask scans and the cached slices stay small.
+FINANCIAL_CACHE: Dict[Tuple[int, int], pd.DataFrame] = {}
+EMPTY_FINANCIAL_DF = pd.DataFrame()
+if not FINANCIAL_DF.empty:
+    EMPTY_FINANCIAL_DF = FINANCIAL_DF.iloc[0:0].set_index(
+        "tickersymbol")[FINANCIAL_COLUMNS]
+    FINANCIAL_CACHE = {
+        key: group.drop_duplicates("tickersymbol").set_index(
+            "tickersymbol")[FINANCIAL_COLUMNS]
+        for key, group in FINANCIAL_DF.groupby(
+            ["quarter", "year"], sort=False)
+    }
+
 
+@functools.lru_cache(maxsize=1)
 def get_stocks_list() -> List[str]:
     """
-    Get the list of stock symbols
+    Get the list of stock symbols.
+    The result is cached; callers must not mutate the returned list.
     """
     try:
-        # logger.info("Fetching the list of stock symbols.")
         stock_list = FUND_DF["Category"].unique().tolist()
         logger.debug(f"Retrieved {len(stock_list)} unique stock symbols.")
         return stock_list
@@ -1,5 +1,7 @@
-from src.recommendation.data import FUND_DF
+from src.recommendation.data import slice_period
+import logging
 import os
+import numpy as np
 import pandas as pd
 from src.utitlies import get_last_month
 from src.settings import logger
@@ -7,95 +9,91 @@ from typing import Tuple, List
 
 
 class InstitutionalScoring:
-
-    class FinancialStatement:
-        def __init__(self, month: int, year: int, symbol: str):
-            self.month = month
-            self.year = year
-            self.symbol = symbol
-            self.data = self.get_data()
-
-        def get_data(self) -> pd.DataFrame:
-            """
-            Load the financial statement data
-            of the stock with the given date:
-            - Fund Code
-            - Market Price
-            - Quantity
-            - Value
-            - Total Asset Ratio
-            """
-            df = FUND_DF[FUND_DF["Category"] == self.symbol]
-            df = df[df["Date"].dt.month == self.month]
-            df = df[df["Date"].dt.year == self.year]
-            df = df.sort_values(by=["Fund Code"])
-            df = df.reset_index(drop=True)
-            return df
-
     def __init__(self, month: int, year: int, symbols: List[str]):
         self.month = month
         self.year = year
         self.symbols = symbols
 
+    @staticmethod
+    def get_net_fund_changes(current_period_df: pd.DataFrame,
+                             last_period_df: pd.DataFrame) -> pd.Series:
+        """
+        Calculate the net fund change of every symbol between two periods:
+        number of funds that increased their holding minus number of funds
+        that decreased it. Funds missing in one period count as 0 value.
+        :return: pd.Series of net fund changes indexed by symbol
+        """
+        if current_period_df.empty or last_period_df.empty:
+            return pd.Series(dtype="int64")
+
+        # One (symbol x fund) table per period instead of a merge per symbol
+        current_values = current_period_df.pivot_table(
+            index="Category", columns="Fund Code", values="Value",
+            aggfunc="sum", fill_value=0.0, observed=True)
+        last_values = last_period_df.pivot_table(
+            index="Category", columns="Fund Code", values="Value",
+            aggfunc="sum", fill_value=0.0, observed=True)
+        current_values, last_values = current_values.align(
+            last_values, join="outer", fill_value=0.0)
+
+        # sign() folds "increased" and "decreased" counts into one pass
+        diff = current_values.to_numpy(dtype=np.float64) - \
+            last_values.to_numpy(dtype=np.float64)
+        net_changes = np.sign(diff).sum(axis=1).astype(np.int64)
+        return pd.Series(net_changes, index=current_values.index)
+
     def get_scores(self) -> pd.DataFrame:
         """
         Calculate scores for a list of symbols and return a DataFrame.
         :return: pd.DataFrame with columns ['Symbol', 'Fund Net Buying', 'Number Fund Holdings', 'Net Fund Change']
         """
-        scores = []
-
-        # Pre-filter the FUND_DF once for the current and last periods to avoid redundant filtering
-        current_period_df = FUND_DF[
-            (FUND_DF["Date"].dt.month == self.month) & (
-                FUND_DF["Date"].dt.year == self.year)
-        ]
+        # Slice the current and last periods out of the sorted FUND_DF
+        current_period_df = slice_period(self.year, self.month)
         last_month, last_year = get_last_month(self.month, self.year)
-        last_period_df = FUND_DF[
-            (FUND_DF["Date"].dt.month == last_month) & (
-                FUND_DF["Date"].dt.year == last_year)
-        ]
+        last_period_df = slice_period(last_year, last_month)
 
-        # Group data by symbol for faster access
-        current_grouped = current_period_df.groupby("Category")
-        last_grouped = last_period_df.groupby("Category")
+        if current_period_df.empty or last_period_df.empty:
+            logger.debug("No fund data found for %d/%d or %d/%d. Skipping.",
+                         self.month, self.year, last_month, last_year)
+            return pd.DataFrame()
 
-        for symbol in self.symbols:
-            current_data = current_grouped.get_group(
-                symbol) if symbol in current_grouped.groups else pd.DataFrame()
-            last_data = last_grouped.get_group(
-                symbol) if symbol in last_grouped.groups else pd.DataFrame()
+        # Aggregate every symbol of both periods in one grouped pass each,
+        # then align them on the requested symbols
+        current = current_period_df.groupby(
+            "Category", sort=False, observed=True)["Value"].agg(
+            ["sum", "size"]).reindex(self.symbols)
+        last_value = last_period_df.groupby(
+            "Category", sort=False, observed=True)["Value"].sum().reindex(
+            self.symbols).to_numpy(dtype=np.float64)
+        current_value = current["sum"].to_numpy(dtype=np.float64)
+        has_data = ~(np.isnan(current_value) | np.isnan(last_value))
 
-            if current_data.empty or last_data.empty:
+        if logger.isEnabledFor(logging.DEBUG):
+            for symbol in np.asarray(self.symbols, dtype=object)[~has_data]:
                 logger.debug(
-                    f"No data found for {symbol} ({self.month}/{self.year})"
-                    f" or {last_month}/{last_year}. Skipping."
-                )
-                continue
-
-            try:
-                fund_net_buying = (current_data["Value"].sum(
-                ) - last_data["Value"].sum()) / last_data["Value"].sum()
-            except ZeroDivisionError:
-                logger.error(
-                    f"Division by zero encountered for {symbol} ({self.month}/{self.year})")
-                fund_net_buying = 0.0
+                    "No data found for %s (%d/%d) or %d/%d. Skipping.",
+                    symbol, self.month, self.year, last_month, last_year)
 
-            number_fund_holdings = len(current_data)
+        if not has_data.any():
+            return pd.DataFrame()
 
-            # Calculate net fund change
-            merged_df = pd.merge(
-                current_data, last_data, on="Fund Code", how="outer", suffixes=("_current", "_last")
-            ).fillna(0)
-            net_fund_change = (
-                (merged_df["Value_current"] > merged_df["Value_last"]).sum() -
-                (merged_df["Value_current"] < merged_df["Value_last"]).sum()
-            )
+        symbols = np.asarray(self.symbols, dtype=object)[has_data]
+        current_value = current_value[has_data]
+        last_value = last_value[has_data]
+        # A zero last value gives inf (or NaN), as the per-symbol float
+        # division did
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fund_net_buying = (current_value - last_value) / last_value
 
-            scores.append({
-                "symbol": symbol,
-                "fund_net_buying": fund_net_buying,
-                "number_fund_holdings": number_fund_holdings,
-                "net_fund_change": net_fund_change
-            })
+        net_fund_changes = self.get_net_fund_changes(
+            current_period_df, last_period_df)
 
-        return pd.DataFrame(scores)
+        # Build the frame from typed arrays to skip per-row dtype inference
+        return pd.DataFrame({
+            "symbol": symbols,
+            "fund_net_buying": fund_net_buying,
+            "number_fund_holdings": current["size"].to_numpy()[
+                has_data].astype(np.int32),
+            "net_fund_change": net_fund_changes.reindex(
+                symbols).to_numpy().astype(np.int32),
+        }, copy=False)
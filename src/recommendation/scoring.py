@@ -1,23 +1,67 @@
-from src.settings import logger, DATA_PATH
-from typing import List, Tuple, Dict, Any
+from src.settings import logger, DATA_PATH, DEBUG
+from typing import (
+    List, Tuple, Dict, Any, Iterable, Mapping, Optional)
+import numpy as np
 import pandas as pd
+import functools
+import logging
 import os
-from collections import defaultdict
 
 
+MONTHLY_SCORES_COLUMNS = [
+    "symbol", "fund_net_buying", "number_fund_holdings", "net_fund_change",
+    "roe", "debt_to_equity", "revenue_growth", "pe", "month", "year",
+]
+SCORE_COLUMNS = [column for column in MONTHLY_SCORES_COLUMNS
+                 if column not in ("symbol", "month", "year")]
+INST_COLUMNS = ["fund_net_buying", "number_fund_holdings", "net_fund_change"]
+FIN_COLUMNS = ["roe", "revenue_growth", "debt_to_equity", "pe_score"]
+# params entries the score weights are derived from
+WEIGHT_PARAMS = ("fund_net_buying", "number_fund_holdings",
+                 "roe", "revenue_growth", "pe")
+
 try:
-    MONTHLY_SCORES_DF = pd.read_csv(
-        os.path.join(DATA_PATH, "monthly_scores.csv"))
+    MONTHLY_SCORES_DF = pd.read_parquet(
+        os.path.join(DATA_PATH, "monthly_scores.parquet"), engine="pyarrow",
+        columns=MONTHLY_SCORES_COLUMNS)
     MONTHLY_SCORES_DF["symbol"] = MONTHLY_SCORES_DF["symbol"].astype(
         "category")
-    MONTHLY_CACHE = defaultdict(pd.DataFrame)
-    for (m, y), df in MONTHLY_SCORES_DF.groupby(["month", "year"]):
-        MONTHLY_CACHE[(m, y)] = df.set_index("symbol")
+    # float32 halves the bytes moved by the normalization passes
+    MONTHLY_SCORES_DF[SCORE_COLUMNS] = MONTHLY_SCORES_DF[
+        SCORE_COLUMNS].astype("float32")
+    # symbol -> categorical code, for integer membership tests
+    SYMBOL_CODES = {
+        symbol: code for code, symbol in enumerate(
+            MONTHLY_SCORES_DF["symbol"].cat.categories)
+    }
+    # save_monthly_scores stores rows sorted by period; sort files written
+    # by older versions too, so that each month is a contiguous block
+    period_keys = MONTHLY_SCORES_DF["year"].to_numpy(dtype=np.int64) * 100 \
+        + MONTHLY_SCORES_DF["month"].to_numpy(dtype=np.int64)
+    if not np.all(period_keys[1:] >= period_keys[:-1]):
+        order = np.argsort(period_keys, kind="stable")
+        MONTHLY_SCORES_DF = MONTHLY_SCORES_DF.take(order).reset_index(
+            drop=True)
+        period_keys = period_keys[order]
+    # Sorted period keys (year * 100 + month) for binary-search slicing
+    MONTHLY_PERIOD_KEYS = period_keys
     logger.info(
         f"Monthly scores data loaded successfully with {len(MONTHLY_SCORES_DF)} rows."
     )
 except Exception as e:
     logger.error(f"Failed to load monthly scores data: {e}")
+    MONTHLY_SCORES_DF = pd.DataFrame(columns=MONTHLY_SCORES_COLUMNS)
+    MONTHLY_PERIOD_KEYS = np.empty(0, dtype=np.int64)
+    SYMBOL_CODES = {}
+
+
+def symbol_codes(symbols: Iterable[str]) -> np.ndarray:
+    """
+    Categorical codes of the given symbols, skipping unknown ones.
+    """
+    return np.fromiter(
+        (SYMBOL_CODES[s] for s in symbols if s in SYMBOL_CODES),
+        dtype=np.int32)
 
 
 class StocksRanking:
@@ -34,117 +78,339 @@ class StocksRanking:
         self.params = params
 
     @staticmethod
-    def normalize_columns(df: pd.DataFrame, columns: List[str]
-                          ) -> pd.DataFrame:
-        min_vals = df[columns].min()
-        max_vals = df[columns].max()
-        diff = max_vals - min_vals
-        normalized = df[columns].sub(min_vals).div(diff.where(diff != 0, 1))
-        return normalized.fillna(0)
-
-    def get_all_scores(self) -> pd.DataFrame:
-        """
-        Retrieve and merge institutional and financial scores for all symbols.
-        If any scores are missing, set them to 0.
-        """
-        df = MONTHLY_CACHE.get((self.month, self.year))
-        self.symbols = list(
-            set(self.symbols).intersection(df.index.tolist())
-        )
-        if df is not None:
-            return df.loc[self.symbols].reset_index().copy()
-        # Empty if no match
-        return pd.DataFrame(columns=MONTHLY_SCORES_DF.columns)
+    def normalize(values: np.ndarray,
+                  starts: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Min-max normalize each column of a 2-D array in one reduction pass.
+        Constant columns become 0 and missing values are set to 0.
+        :param values: 2-D array to normalize.
+        :param starts: Sorted first rows of contiguous blocks that are
+            normalized separately. Defaults to one block.
+        :return: Normalized float64 array.
+        """
+        if values.shape[0] == 0:
+            return values
+        if starts is None:
+            starts = np.zeros(1, dtype=np.intp)
+        # fmin/fmax skip NaN like pandas min/max
+        min_vals = np.fmin.reduceat(values, starts, axis=0)
+        max_vals = np.fmax.reduceat(values, starts, axis=0)
+        if len(starts) > 1:
+            counts = np.diff(np.r_[starts, values.shape[0]])
+            min_vals = np.repeat(min_vals, counts, axis=0)
+            max_vals = np.repeat(max_vals, counts, axis=0)
+        # Infinite inputs (e.g. pe_score with zero revenue growth) give NaN,
+        # which is mapped to 0 below.
+        # One output buffer; subtract, divide and zero-fill write into it
+        with np.errstate(invalid="ignore", divide="ignore"):
+            diff = max_vals - min_vals
+            diff[diff == 0] = 1.0
+            normalized = np.subtract(values, min_vals, dtype=np.float64)
+            np.divide(normalized, diff, out=normalized)
+        np.copyto(normalized, 0.0, where=np.isnan(normalized))
+        return normalized
+
+    @staticmethod
+    def prepare_fin_values(columns: Mapping[str, Any]) -> np.ndarray:
+        """
+        Clip debt-to-equity and derive pe_score on one float64 block.
+        :param columns: DataFrame or dict of arrays with roe, revenue_growth,
+            debt_to_equity and pe.
+        :return: Array with the FIN_COLUMNS, not yet normalized.
+        """
+        values = np.column_stack([
+            np.asarray(columns[column], dtype=np.float64)
+            for column in ("roe", "revenue_growth", "debt_to_equity", "pe")])
+        np.clip(values[:, 2], 0.0, 2.0, out=values[:, 2])
+        revenue_growth = values[:, 1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pe_score = (revenue_growth - values[:, 3]) / revenue_growth
+        values[:, 3] = np.where(pe_score < 0.0, 0.0, pe_score)
+        return values
 
-    def calculate_institutional_score(self, df: pd.DataFrame) -> None:
+    @staticmethod
+    def get_inst_weights(params: Dict[str, Any]) -> np.ndarray:
         """
-        Calculate the institutional score based on fund net buying, number of fund holdings, and net fund change.
+        Weights of the INST_COLUMNS; net fund change takes the remainder.
         """
-        # Normalize columns
-        columns = ["fund_net_buying",
-                   "number_fund_holdings", "net_fund_change"]
-        df[columns] = StocksRanking.normalize_columns(df, columns)
-        # Calculate institutional score
         net_fund_change_w = 1.0 - \
-            self.params["fund_net_buying"] - \
-            self.params["number_fund_holdings"]
+            params["fund_net_buying"] - \
+            params["number_fund_holdings"]
         assert net_fund_change_w >= 0.0, (
             f"Invalid weight for net fund change: {net_fund_change_w}"
         )
-        df["inst_score"] = (
-            self.params["fund_net_buying"] * df["fund_net_buying"]
-            + self.params["number_fund_holdings"] * df["number_fund_holdings"]
-            + net_fund_change_w * df["net_fund_change"]
-        ).fillna(0).clip(lower=0)
-        # log error if any score is greater than 1.0
-        if (df["inst_score"] > 1.0).any():
-            logger.error(
-                f"Invalid institutional score:\n{df[df['inst_score'] > 1.0][[
-                    'symbol', 'inst_score', 'fund_net_buying',
-                    'number_fund_holdings', 'net_fund_change'
-                ]].to_string()}"
-            )
-            logger.info(
-                f"Weights: {self.params['fund_net_buying']}, "
-                f"{self.params['number_fund_holdings']}, "
-                f"{net_fund_change_w}"
-            )
+        return np.array([params["fund_net_buying"],
+                         params["number_fund_holdings"],
+                         net_fund_change_w])
 
-    def calculate_fin_score(self, df: pd.DataFrame) -> None:
+    @staticmethod
+    def get_fin_weights(params: Dict[str, Any]) -> np.ndarray:
         """
-        Calculate the financial score (fin_score) based on ROE, PE, revenue growth, and debt-to-equity ratio.
+        Weights of the FIN_COLUMNS; debt-to-equity takes the remainder.
         """
-        df["debt_to_equity"] = df["debt_to_equity"].clip(lower=0.0, upper=2.0)
-        df["pe_score"] = (
-            (df["revenue_growth"] - df["pe"]) / df["revenue_growth"]
-        ).clip(lower=0.0)
-
-        # Normalize columns
-        columns = ["roe", "revenue_growth", "debt_to_equity", "pe_score"]
-        df[columns] = StocksRanking.normalize_columns(df, columns)
-
-        # Calculate financial score
-        de_weight = 1.0 - self.params["roe"] - \
-            self.params["revenue_growth"] - self.params["pe"]
+        de_weight = 1.0 - params["roe"] - \
+            params["revenue_growth"] - params["pe"]
         if abs(de_weight) < 1e-6:
             de_weight = 0.0
         assert de_weight >= 0.0, (
             f"Invalid weight for debt-to-equity: {de_weight}"
-            f" (roe: {self.params['roe']}, "
-            f"revenue_growth: {self.params['revenue_growth']}, "
-            f"pe: {self.params['pe']})"
+            f" (roe: {params['roe']}, "
+            f"revenue_growth: {params['revenue_growth']}, "
+            f"pe: {params['pe']})"
         )
-        df["fin_score"] = (
-            self.params["roe"] * df["roe"]
-            + self.params["revenue_growth"] * df["revenue_growth"]
-            + de_weight * df["debt_to_equity"]
-            + self.params["pe"] * df["pe_score"]
-        ).fillna(0).clip(lower=0)
+        return np.array([params["roe"],
+                         params["revenue_growth"],
+                         de_weight,
+                         params["pe"]])
+
+    @staticmethod
+    def get_weights(params: Dict[str, Any]) -> np.ndarray:
+        """
+        Block-diagonal (INST_COLUMNS + FIN_COLUMNS) x [inst, fin] weight
+        matrix, so both weighted sums are one matrix product.
+        """
+        n_inst = len(INST_COLUMNS)
+        weights = np.zeros((n_inst + len(FIN_COLUMNS), 2))
+        weights[:n_inst, 0] = StocksRanking.get_inst_weights(params)
+        weights[n_inst:, 1] = StocksRanking.get_fin_weights(params)
+        return weights
+
+    @staticmethod
+    def weighted_score(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Weighted sum of the columns with missing scores set to 0 and negative
+        scores clipped to 0, both in place on the result.
+        """
+        score = values @ weights
+        np.nan_to_num(score, copy=False, nan=0.0)
+        np.maximum(score, 0.0, out=score)
+        return score
+
+    @staticmethod
+    def score_block(normalized: np.ndarray, weights: np.ndarray,
+                    institutional_weight: float
+                    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score normalized inputs in one fused step: both clipped weighted sums
+        from one matrix product, then the total score from a second product
+        with [w, 1 - w].
+        :param normalized: Normalized (rows x 7) INST_COLUMNS + FIN_COLUMNS.
+        :param weights: Weight matrix from get_weights.
+        :param institutional_weight: Weight of the institutional score.
+        :return: Tuple of the (rows x 2) [inst, fin] scores and total scores.
+        """
+        inst_fin_scores = StocksRanking.weighted_score(normalized, weights)
+        scores = inst_fin_scores @ np.array(
+            [institutional_weight, 1.0 - institutional_weight])
+        return inst_fin_scores, scores
+
+    @staticmethod
+    def check_institutional_score(symbols: np.ndarray, inst_mat: np.ndarray,
+                                  inst_score: np.ndarray,
+                                  params: Dict[str, Any]) -> None:
+        """
+        Log symbols whose institutional score is greater than 1.0.
+        """
+        # this sanity check is an extra pass per call, so it only runs in
+        # debug mode
+        if not (DEBUG and logger.isEnabledFor(logging.ERROR)):
+            return
+        invalid_rows = np.flatnonzero(inst_score > 1.0)
+        if invalid_rows.size:
+            # Only the offending rows are put in a frame and formatted
+            invalid = pd.DataFrame(
+                inst_mat[invalid_rows], columns=INST_COLUMNS)
+            invalid.insert(0, "inst_score", inst_score[invalid_rows])
+            invalid.insert(0, "symbol", symbols[invalid_rows])
+            logger.error(
+                f"Invalid institutional score:\n{invalid.to_string()}")
+            logger.info(
+                f"Weights: {params['fund_net_buying']}, "
+                f"{params['number_fund_holdings']}, "
+                f"{StocksRanking.get_inst_weights(params)[2]}"
+            )
+
+    @classmethod
+    def rank_many(cls, month_year_pairs: Iterable[Tuple[int, int]],
+                  symbols: List[str], params: Dict[str, Any]
+                  ) -> Dict[Tuple[int, int], List[Tuple[str, float]]]:
+        """
+        Rank several months in one vectorized pass instead of one instance
+        per month.
+        :param month_year_pairs: (month, year) pairs to rank.
+        :param symbols: List of stock symbols.
+        :param params: Ranking parameters.
+        :return: Dictionary mapping (month, year) to the top-ranked symbols
+            with their scores. Months without scores are omitted.
+        """
+        return precompute_all_rankings(params, symbols, month_year_pairs)
+
+    @staticmethod
+    def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+        """
+        Indices of the k largest scores in descending order, in O(n) plus a
+        sort of the k winners. Ties keep the earlier position, like
+        DataFrame.nlargest(keep="first").
+        :param scores: 1-D array of scores.
+        :param k: Number of indices to return.
+        :return: Integer index array of length min(k, len(scores)).
+        """
+        n = len(scores)
+        if k <= 0 or n == 0:
+            return np.empty(0, dtype=np.intp)
+        if k < n:
+            kth = np.partition(scores, n - k)[n - k]
+            above = np.flatnonzero(scores > kth)
+            ties = np.flatnonzero(scores == kth)[:k - len(above)]
+            idx = np.concatenate((above, ties))
+        else:
+            idx = np.arange(n)
+        return idx[np.lexsort((idx, -scores[idx]))]
 
     def get_ranking(self) -> List[Tuple[str, float]]:
         """
         Combine institutional and financial scores into a total score and rank the stocks.
         :return: List of tuples containing stock symbols and their scores.
         """
-        df = self.get_all_scores()
+        return precompute_all_rankings(
+            self.params, self.symbols, [(self.month, self.year)]
+        ).get((self.month, self.year), [])
 
-        # Calculate institutional and financial scores
-        self.calculate_institutional_score(df)
-        self.calculate_fin_score(df)
 
-        # Combine scores into a total score
-        df["score"] = self.params["institutional_weight"] * df["inst_score"] \
-            + (1.0 - self.params["institutional_weight"]) * df["fin_score"]
+def _read_only(*arrays: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    Mark cached arrays read-only so callers cannot mutate shared state.
+    """
+    for array in arrays:
+        array.setflags(write=False)
+    return arrays
 
-        # Sort by score in descending order
-        top_stocks = df.nlargest(self.params["number_of_stocks"], "score")[
-            ["symbol", "score"]].values.tolist()
 
-        logger.debug(
-            f"Institutional and financial scores:\n"
-            f"{df[['symbol', 'inst_score', 'fin_score', 'score']]
-               .head(10).to_string(index=False)}"
-        )
+def weights_key(params: Dict[str, Any]) -> Tuple[float, ...]:
+    """
+    Hashable key of the score weights in params.
+    """
+    return tuple(params[name] for name in WEIGHT_PARAMS)
 
-        # Return the top-ranked symbols with their scores
-        return top_stocks
+
+@functools.lru_cache(maxsize=256)
+def _get_weights(key: Tuple[float, ...]) -> np.ndarray:
+    """
+    Build the weight matrix once per distinct set of weight values,
+    rather than per params dict, so reused or copied params share it.
+    Results are cached, so the returned array is read-only.
+    :param key: Weight values, from weights_key.
+    :return: Combined weight matrix from StocksRanking.get_weights.
+    """
+    return _read_only(
+        StocksRanking.get_weights(dict(zip(WEIGHT_PARAMS, key))))[0]
+
+
+def normalize_by_month(df: pd.DataFrame) -> np.ndarray:
+    """
+    Min-max normalize the institutional and financial inputs within each
+    (month, year) with StocksRanking.normalize.
+    :param df: Monthly scores, with the rows of each month contiguous as in
+        MONTHLY_SCORES_DF.
+    :return: Array with the INST_COLUMNS + FIN_COLUMNS, row-aligned with df.
+    """
+    if df.empty:
+        return np.empty((0, len(INST_COLUMNS) + len(FIN_COLUMNS)))
+    # Work on one float64 block
+    block = np.hstack((df[INST_COLUMNS].to_numpy(dtype=np.float64),
+                       StocksRanking.prepare_fin_values(df)))
+    period_keys = df["year"].to_numpy(dtype=np.int64) * 100 \
+        + df["month"].to_numpy(dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, period_keys[1:] != period_keys[:-1]])
+    return StocksRanking.normalize(block, starts)
+
+
+@functools.lru_cache(maxsize=1)
+def get_monthly_normalized() -> np.ndarray:
+    """
+    Normalized INST_COLUMNS + FIN_COLUMNS of every month over all its
+    symbols, row-aligned with MONTHLY_SCORES_DF. Computed on first use, so
+    importing the module does not normalize every month up front. The
+    result is cached, so the returned array is read-only.
+    """
+    return _read_only(normalize_by_month(MONTHLY_SCORES_DF))[0]
+
+
+def precompute_all_rankings(params: Dict[str, Any],
+                            symbols: Optional[List[str]] = None,
+                            periods: Optional[Iterable[Tuple[int, int]]] = None
+                            ) -> Dict[Tuple[int, int], List[Tuple[str, float]]]:
+    """
+    Rank every (month, year) of the monthly scores in one vectorized pass,
+    normalizing within each month. This is the only ranking path;
+    StocksRanking.get_ranking calls it for a single month.
+    :param params: Ranking parameters, including number_of_stocks.
+    :param symbols: Symbols to rank. Defaults to all symbols.
+    :param periods: (month, year) pairs to rank. Defaults to all months.
+    :return: Dictionary mapping (month, year) to the top-ranked symbols with
+        their scores.
+    """
+    df = MONTHLY_SCORES_DF
+    if df.empty:
+        # Also covers the fallback frame, whose symbol is not categorical
+        return {}
+    values = get_monthly_normalized()
+    if periods is not None:
+        # Normalization is per month, so dropping whole months is safe
+        wanted = np.fromiter((year * 100 + month for month, year in periods),
+                             dtype=np.int64)
+        in_periods = np.isin(MONTHLY_PERIOD_KEYS, wanted)
+        df = df[in_periods]
+        values = values[in_periods]
+    if symbols is not None:
+        mask = np.isin(df["symbol"].cat.codes.to_numpy(),
+                       symbol_codes(symbols))
+        if not mask.all():
+            # A subset changes each month's min/max, so renormalize it
+            df = df[mask]
+            values = normalize_by_month(df)
+    if df.empty:
+        return {}
+
+    # Score the whole frame in one fused step
+    inst_fin_scores, scores = StocksRanking.score_block(
+        values, _get_weights(weights_key(params)),
+        params["institutional_weight"])
+    symbols = df["symbol"].to_numpy(dtype=object)
+    StocksRanking.check_institutional_score(
+        symbols, values[:, :len(INST_COLUMNS)], inst_fin_scores[:, 0],
+        params)
+
+    # Group rows by period with a stable integer sort; rows are normally
+    # stored in period order already, so this is close to a no-op
+    months = df["month"].to_numpy()
+    years = df["year"].to_numpy()
+    period_keys = years.astype(np.int64) * 100 + months
+    order = np.argsort(period_keys, kind="stable")
+    sorted_keys = period_keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+
+    # Partial top-k selection inside each period block, instead of sorting
+    # every score
+    k = params["number_of_stocks"]
+    debug = logger.isEnabledFor(logging.DEBUG)
+    rankings = {}
+    for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+        rows = order[start:end]
+        top = rows[StocksRanking.top_k_indices(scores[rows], k)]
+        period = (int(months[rows[0]]), int(years[rows[0]]))
+        rankings[period] = list(
+            zip(symbols[top].tolist(), scores[top].tolist()))
+        # The full sort for the log is only paid when DEBUG is enabled
+        if debug:
+            head = rows[np.argsort(-scores[rows], kind="stable")[:10]]
+            logger.debug(
+                f"Institutional and financial scores of {period}:\n"
+                f"{pd.DataFrame({
+                    'symbol': symbols[head],
+                    'inst_score': inst_fin_scores[head, 0],
+                    'fin_score': inst_fin_scores[head, 1],
+                    'score': scores[head]
+                }).to_string(index=False)}"
+            )
+    return rankings
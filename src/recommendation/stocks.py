@@ -1,9 +1,37 @@
-from src.recommendation.data import FINANCIAL_DF
-from src.utitlies import get_last_month
+from src.recommendation.data import (
+    FINANCIAL_CACHE, EMPTY_FINANCIAL_DF, FINANCIAL_COLUMNS)
 from src.settings import logger
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from typing import List
+import functools
+import logging
+from typing import List, Tuple, Dict
+
+
+@functools.lru_cache(maxsize=128)
+def _load_slice(quarter: int, year: int, symbols: Tuple[str, ...]
+                ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Financial data of the quarter aligned on the given symbols. Results are
+    cached, so the returned arrays are read-only.
+    :param quarter: Quarter of the financial data.
+    :param year: Year of the financial data.
+    :param symbols: Requested symbols, in output order.
+    :return: Tuple of (FINANCIAL_COLUMNS as a float32 block, mask of the
+        symbols with data in the quarter).
+    """
+    df = FINANCIAL_CACHE.get((quarter, year), EMPTY_FINANCIAL_DF)
+    # One lookup against the ticker index gives both the row positions and
+    # the membership mask
+    rows = df.index.get_indexer(symbols)
+    has_data = rows >= 0
+    values = np.full((len(symbols), len(FINANCIAL_COLUMNS)), np.nan,
+                     dtype=np.float32)
+    values[has_data] = df[FINANCIAL_COLUMNS].to_numpy(
+        dtype=np.float32)[rows[has_data]]
+    values.setflags(write=False)
+    has_data.setflags(write=False)
+    return values, has_data
 
 
 class FinancialScoring:
@@ -12,72 +40,87 @@ class FinancialScoring:
         self.year = year
         self.symbols = symbols
         self.data = self.get_data(self.quarter, self.year)
-        last_quarter = self.quarter - 1 if self.quarter > 1 else 4
-        last_year = self.year - 1 if last_quarter == 4 else self.year
-        self.last_data = self.get_data(last_quarter, last_year)
+        self.last_quarter = self.quarter - 1 if self.quarter > 1 else 4
+        self.last_year = self.year - 1 if self.last_quarter == 4 \
+            else self.year
+        self.last_data = self.get_data(self.last_quarter, self.last_year)
 
     def get_data(self, quarter: int, year: int) -> pd.DataFrame:
         """
-        Load the financial data for the given quarter and year.
-        """
-        df = FINANCIAL_DF[
-            (FINANCIAL_DF["tickersymbol"].isin(self.symbols)) &
-            (FINANCIAL_DF["quarter"] == quarter) &
-            (FINANCIAL_DF["year"] == year)
-        ].reset_index(drop=True)
-        return df
-
-    def safe_get_value(self, df: pd.DataFrame, column: str, default: float = 0.0) -> float:
-        """
-        Safely retrieve a value from a DataFrame column.
-        :param df: DataFrame containing financial data.
-        :param column: Column name to retrieve the value from.
-        :param default: Default value to return if the column is missing or empty.
-        :return: Retrieved value or default.
+        Load the financial data for the given quarter and year,
+        indexed by ticker symbol (first row per symbol).
         """
-        if column in df.columns and not df.empty:
-            return df[column].iloc[0]
-        return default
+        return FINANCIAL_CACHE.get((quarter, year), EMPTY_FINANCIAL_DF)
 
-    def get_revenue_growth(self, cur_df: pd.DataFrame, last_df: pd.DataFrame) -> float:
+    @staticmethod
+    def get_growth(current: np.ndarray, last: np.ndarray) -> np.ndarray:
         """
-        Calculate the revenue growth for the given DataFrames.
-        :param cur_df: Current quarter's financial data.
-        :param last_df: Last quarter's financial data.
-        :return: Revenue growth value.
+        Percentage growth from last to current, computed in a single buffer.
+        Growth is 0 when there is no positive base value or the ratio is not
+        finite (missing or overflowing values).
         """
-        current_revenue = self.safe_get_value(cur_df, "Revenue")
-        last_revenue = self.safe_get_value(last_df, "Revenue")
-        if last_revenue > 0:
-            return ((current_revenue - last_revenue) / last_revenue) * 100
-        return 0.0
+        # Only entries with a positive base are computed, so there is no
+        # division by zero or NaN to mask out afterwards
+        valid = last > 0
+        growth = np.zeros_like(current)
+        with np.errstate(over="ignore", invalid="ignore"):
+            np.subtract(current, last, out=growth, where=valid)
+            np.divide(growth, last, out=growth, where=valid)
+            growth *= 100
+        growth[~np.isfinite(growth)] = 0.0
+        return growth
 
-    def get_scores(self) -> pd.DataFrame:
+    def get_score_arrays(self) -> Dict[str, np.ndarray]:
         """
-        Calculate scores for the financial data.
-        :return: pd.DataFrame with columns ['symbol', 'roe', 'debt_to_equity', 'revenue_growth', 'cash_ratio', 'pe']
+        Calculate scores for the financial data as column arrays, for
+        callers that do not need a DataFrame.
+        :return: Dictionary of 'symbol', 'roe', 'debt_to_equity',
+            'revenue_growth' and 'pe' arrays, empty if no symbol has data.
         """
-        scores = []
+        if self.data.empty or self.last_data.empty:
+            # No symbol can have data, skip the alignment and the
+            # per-symbol logging
+            logger.debug("No financial data for Q%d/%d or the previous "
+                         "quarter. Skipping.", self.quarter, self.year)
+            return {}
 
-        for symbol in self.symbols:
-            cur_df = self.data[self.data["tickersymbol"] == symbol]
-            last_df = self.last_data[self.last_data["tickersymbol"] == symbol]
+        # Both quarters aligned on the requested symbols; each quarter is
+        # shared by consecutive calls (e.g. the three months using it)
+        symbols = tuple(self.symbols)
+        current, has_current = _load_slice(self.quarter, self.year, symbols)
+        last, has_last = _load_slice(
+            self.last_quarter, self.last_year, symbols)
+        has_data = has_current & has_last
 
-            if cur_df.empty or last_df.empty:
+        if logger.isEnabledFor(logging.DEBUG):
+            for symbol in np.asarray(self.symbols, dtype=object)[~has_data]:
                 logger.debug(
-                    f"No data available for {symbol} (Q{self.quarter}/{self.year}). Skipping.")
-                continue
+                    "No data available for %s (Q%d/%d). Skipping.",
+                    symbol, self.quarter, self.year)
+
+        if not has_data.any():
+            return {}
 
-            scores.append({
-                "symbol": symbol,
-                "roe": self.safe_get_value(cur_df, "ROE"),
-                "debt_to_equity": self.safe_get_value(cur_df, "Debt/Equity"),
-                "revenue_growth": self.get_revenue_growth(cur_df, last_df),
-                # "cash_ratio": self.safe_get_value(cur_df, "Cash") / max(self.safe_get_value(cur_df, "Liabilities"), 1),
-                "pe": self.safe_get_value(cur_df, "P/E")
-            })
+        current = current[has_data]
+        return {
+            "symbol": np.asarray(self.symbols, dtype=object)[has_data],
+            "roe": current[:, 1],
+            "debt_to_equity": current[:, 2],
+            "revenue_growth": self.get_growth(
+                current[:, 0], last[has_data, 0]),
+            "pe": current[:, 3],
+        }
 
-        scores_df = pd.DataFrame(scores)
-        logger.debug(
-            f"Scores DataFrame before normalization: \n{scores_df.head(10).to_string(index=False)}")
+    def get_scores(self) -> pd.DataFrame:
+        """
+        Calculate scores for the financial data.
+        :return: pd.DataFrame with columns ['symbol', 'roe', 'debt_to_equity', 'revenue_growth', 'pe']
+        """
+        scores = self.get_score_arrays()
+        if not scores:
+            return pd.DataFrame()
+        scores_df = pd.DataFrame(scores, copy=False)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Scores DataFrame before normalization: \n{scores_df.head(10).to_string(index=False)}")
         return scores_df
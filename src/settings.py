@@ -2,12 +2,14 @@ import os
 import sys
 from dotenv import load_dotenv
 from pathlib import Path
+import functools
 import logging
 import logging.config
 from vnstock import Vnstock
 import yaml
 import random
 import numpy as np
+import pandas as pd
 
 # Load .env file
 env_path = Path(__file__).parent / ".env"
@@ -21,9 +23,13 @@ DEBUG = config.get("debug", True)
 
 # Load logging configuration
 LOGGING_CONFIG_PATH = Path(__file__).parent.parent / "config" / "logging.conf"
-logging.config.fileConfig(LOGGING_CONFIG_PATH, defaults={
-                          'sys.stdout': sys.stdout})
 logger = logging.getLogger("my_logger")
+# Configure once per process: re-importing settings (e.g. as both
+# "settings" and "src.settings") must not rebuild the handlers, which
+# would truncate app.log and close the open handlers
+if not logger.handlers:
+    logging.config.fileConfig(LOGGING_CONFIG_PATH, defaults={
+                              'sys.stdout': sys.stdout})
 logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
 logger.disabled = config.get("disable_logging", False)
 
@@ -45,8 +51,20 @@ else:
     logger.info(f"Data path already exists at {DATA_PATH}")
 
 
-# Init Vnstock
-vnstock = Vnstock().stock(symbol="ACB", source="VCI")
+@functools.cache
+def get_vnstock():
+    """
+    Shared Vnstock client, created on first use so that importing the
+    settings does not set up its HTTP session.
+    """
+    return Vnstock().stock(symbol="ACB", source="VCI")
+
+
+# Copy-on-Write lets pandas share data between derived frames instead of
+# making defensive copies. It is always on (and the option deprecated)
+# from pandas 3.0.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.options.mode.copy_on_write = True
 
 # Set random seed for reproducibility
 random_seed = config.get("random_seed", 42)
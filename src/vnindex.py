@@ -1,35 +1,132 @@
-from src.settings import logger, DATA_PATH
+from src.settings import logger, DATA_PATH, get_vnstock
 import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Tuple
 from datetime import datetime  # Ensure correct import of datetime
 import argparse
 
 
-def get_vnindex_benchmark(start_date: datetime, end_date: datetime
-                          ) -> pd.DataFrame:
+def fetch_vnindex(start_date: datetime, end_date: datetime) -> pd.DataFrame:
     """
-    Get VNINDEX benchmark data from vnstock API.
+    Download VNINDEX benchmark data from vnstock API.
     """
-    from src.settings import vnstock
     logger.debug(
         f"Fetching VNINDEX benchmark data from {start_date} to {end_date}.")
-    vnindex = vnstock.quote.history(symbol="VNINDEX",
-                                    start=start_date.strftime("%Y-%m-%d"),
-                                    end=end_date.strftime("%Y-%m-%d"))
-    vnindex = vnindex[["time", "close"]].copy()
-    vnindex.rename(columns={
-        "time": "datetime",
-        "close": "total_assets"}, inplace=True)
-    vnindex["datetime"] = pd.to_datetime(vnindex["datetime"])
+    try:
+        vnindex = get_vnstock().quote.history(
+            symbol="VNINDEX", start=start_date.strftime("%Y-%m-%d"),
+            end=end_date.strftime("%Y-%m-%d"))
+    except ValueError as e:
+        # vnstock raises when the range has no trading day
+        logger.debug(f"No VNINDEX data from {start_date} to {end_date}: {e}")
+        return pd.DataFrame({
+            "datetime": pd.Series(dtype="datetime64[ns]"),
+            "total_assets": pd.Series(dtype="float64")})
     # Ensure sorted by datetime
-    vnindex.sort_values(by="datetime", inplace=True)
-    vnindex.set_index("datetime", inplace=False,
-                      drop=False)  # Keep `datetime` column
+    vnindex = (
+        vnindex.loc[:, ["time", "close"]]
+        .rename(columns={"time": "datetime", "close": "total_assets"})
+        .assign(datetime=lambda df: pd.to_datetime(
+            df["datetime"], format="%Y-%m-%d", cache=True))
+        .sort_values("datetime", ignore_index=True)
+    )
     logger.debug(
         f"VNINDEX benchmark data fetched successfully with {len(vnindex)} rows.")
     return vnindex
 
 
+def read_vnindex_cache(cache_path: str
+                       ) -> Tuple[pd.DataFrame, pd.Timestamp, pd.Timestamp]:
+    """
+    Read the cached VNINDEX data and the date range it covers.
+    :param cache_path: Path of the Parquet cache.
+    :return: Tuple of (data, first covered date, last covered date).
+    """
+    table = pq.read_table(cache_path, columns=["datetime", "total_assets"])
+    metadata = table.schema.metadata or {}
+    return (table.to_pandas(),
+            pd.Timestamp(metadata[b"covered_start"].decode()),
+            pd.Timestamp(metadata[b"covered_end"].decode()))
+
+
+def write_vnindex_cache(cache_path: str, vnindex: pd.DataFrame,
+                        covered_start: pd.Timestamp,
+                        covered_end: pd.Timestamp) -> None:
+    """
+    Write the VNINDEX data with the date range it covers to the cache.
+    :param cache_path: Path of the Parquet cache.
+    :param vnindex: VNINDEX data.
+    :param covered_start: First date the data covers.
+    :param covered_end: Last date the data covers.
+    """
+    table = pa.Table.from_pandas(vnindex, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"covered_start": covered_start.isoformat().encode(),
+        b"covered_end": covered_end.isoformat().encode(),
+    })
+    pq.write_table(table, cache_path)
+
+
+def get_vnindex_benchmark(start_date: datetime, end_date: datetime
+                          ) -> pd.DataFrame:
+    """
+    Get VNINDEX benchmark data. Data is cached in DATA_PATH/vnindex.parquet
+    together with the date range it covers, and only the dates outside
+    that range are downloaded.
+    """
+    start_date = pd.Timestamp(start_date).normalize()
+    end_date = pd.Timestamp(end_date).normalize()
+    cache_path = os.path.join(DATA_PATH, "vnindex.parquet")
+    cached = None
+    if os.path.exists(cache_path):
+        try:
+            cached, covered_start, covered_end = read_vnindex_cache(
+                cache_path)
+        except Exception as e:
+            # Also covers caches written without the covered range
+            logger.warning(f"Failed to read VNINDEX cache: {e}")
+
+    # Date ranges to download, extending the covered range at either end.
+    # Coverage is tracked on requested dates rather than trading days, so
+    # bounds on weekends or holidays do not cause repeated downloads.
+    missing = []
+    if cached is None:
+        covered_start, covered_end = start_date, end_date
+        missing.append((start_date, end_date))
+    else:
+        if start_date < covered_start:
+            missing.append(
+                (start_date, covered_start - pd.Timedelta(days=1)))
+            covered_start = start_date
+        if end_date > covered_end:
+            # Download the last covered day again, it may have been partial
+            missing.append((covered_end, end_date))
+            covered_end = end_date
+
+    vnindex = cached
+    if missing:
+        frames = [fetch_vnindex(start, end) for start, end in missing]
+        if cached is not None:
+            frames.insert(0, cached)
+        vnindex = pd.concat(frames, ignore_index=True).drop_duplicates(
+            "datetime", keep="last").sort_values(
+            "datetime", ignore_index=True)
+        # Today and later days can still change, so they are not covered
+        yesterday = pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+        covered_end = min(covered_end, yesterday)
+        try:
+            write_vnindex_cache(cache_path, vnindex,
+                                covered_start, covered_end)
+        except Exception as e:
+            logger.warning(f"Failed to cache VNINDEX data: {e}")
+
+    in_range = vnindex["datetime"].between(start_date, end_date)
+    return vnindex[in_range].reset_index(drop=True)
+
+
 def eval_vnindex(start_date: datetime, end_date: datetime,
                  result_dir: str = None):
     """